@@ -47,8 +47,10 @@ if uploaded_file:
     show_btn = st.sidebar.button("Show Analysis")
 
     if show_btn:
-        # Filter for selected user
+        # Filter for selected user, and strip media/empty messages once
+        # so each helper doesn't rescan the Message column
         df_sel = df if selected == 'Overall' else df[df['Sender'] == selected]
+        df_text = df_sel.loc[helper.filter_mask(df_sel), ['date', 'Sender', 'Message']]
 
         # Display header
         st.markdown(
@@ -57,7 +59,7 @@ if uploaded_file:
         )
 
         # Fetch stats
-        msgs, words, media_count, emoji_count, urls_shared = helper.fetch_stats(selected, df)
+        msgs, words, media_count, emoji_count, urls_shared = helper.fetch_stats(df_sel)
 
         # KPI metrics
         col1, col2, col3, col4, col5 = st.columns(5)
@@ -70,7 +72,7 @@ if uploaded_file:
         # 1. Messages per user
         if selected == "Overall":
             st.subheader("Most Busy Users")
-            mpu = helper.messages_per_user(df_sel)
+            mpu = helper.messages_per_user(df_text)
             fig1 = px.bar(
                 mpu, x='Sender', y='count',
                 color='count', color_continuous_scale='Greens',
@@ -84,7 +86,7 @@ if uploaded_file:
 
         # 2. Activity heatmap
         st.subheader("Activity Heatmap (Hour vs Weekday)")
-        heat = helper.activity_heatmap(df_sel)
+        heat = helper.activity_heatmap(df_text)
         fig2 = px.imshow(
             heat,
             aspect='auto',
@@ -99,14 +101,14 @@ if uploaded_file:
 
         # 3. Time series
         st.subheader("Time Series")
-        daily = helper.daily_volume(df_sel)
+        daily = helper.daily_volume(df_text)
         fig3 = px.line(
             daily, x='date', y='count',
             color_discrete_sequence=['#25D366'],
             title='Daily Volume'
         )
         st.plotly_chart(fig3)
-        monthly = helper.monthly_volume(df_sel)
+        monthly = helper.monthly_volume(df_text)
         fig4 = px.line(
             monthly, x='date', y='count',
             color_discrete_sequence=['#128C7E'],
@@ -116,7 +118,7 @@ if uploaded_file:
 
         # 4. Word analysis
         st.subheader("Top Words & Wordcloud")
-        topw = helper.top_n_words(df_sel)
+        topw = helper.top_n_words(df_text)
         top_20 = topw.sort_values('count', ascending=False).head(20)
         fig7 = px.bar(
             top_20, x='word', y='count',
@@ -124,8 +126,8 @@ if uploaded_file:
             color_continuous_scale='Greys'
         )
         st.plotly_chart(fig7)
-        wc = helper.generate_wordcloud(df_sel)
-        st.image(wc.to_array(), use_column_width=True)
+        wc = helper.generate_wordcloud(df_text)
+        st.image(wc, use_column_width=True)
 
         # 5. Message types
         st.subheader("Message Types")
@@ -140,7 +142,7 @@ if uploaded_file:
 
         # 6. Sentiment over time
         st.subheader("Sentiment Over Time")
-        sent = helper.sentiment_time_series(df_sel)
+        sent = helper.sentiment_time_series(df_text)
 
         # Initialize figure
         fig9 = go.Figure()
@@ -182,7 +184,7 @@ if uploaded_file:
 
         # 7. Emoji leaderboard
         st.subheader("Top Emojis")
-        topem = helper.top_emojis(df_sel)
+        topem = helper.top_emojis(df_text)
         fig10 = px.bar(
             topem, x='emoji', y='count',
             title='Top Emojis',
@@ -1,69 +1,117 @@
+import re
+
 import pandas as pd
 import numpy as np
+import streamlit as st
 from datetime import timedelta
-from sklearn.feature_extraction.text import CountVectorizer
-from wordcloud import WordCloud
-from textblob import TextBlob
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer
+from sklearn.utils.murmurhash import murmurhash3_32
+from collections import Counter
+from wordcloud import WordCloud, STOPWORDS
+from textblob.en import sentiment as _pattern_lexicon
 import emoji
-from urlextract import URLExtract
 
 # ------------------------------------------------------------------
 # Helper module for WhatsApp Chat Analyzer
 # ------------------------------------------------------------------
 
-def filter_media(df):
+# Compiled once at import: matching emojis with a single regex keeps the
+# per-character loop inside the C regex engine instead of Python. Longest
+# alternatives first so multi-codepoint emojis win over their components.
+EMOJI_RE = re.compile('|'.join(map(re.escape, sorted(emoji.EMOJI_DATA, key=len, reverse=True))))
+
+# Compiled once at import: good enough for chat links and far cheaper than
+# URLExtract's per-call TLD-list load and per-message Python loop.
+URL_RE = re.compile(r'https?://\S+|www\.\S+')
+
+# Word -> average polarity from TextBlob's pattern lexicon, loaded once at
+# import. Scoring is then a dict lookup per token instead of building a
+# TextBlob (tokenizer + lexicon walk) per message.
+_pattern_lexicon.load()
+POLARITY = {word: senses[None][0] for word, senses in _pattern_lexicon.items()}
+WORD_RE = re.compile(r"[a-z']+")
+
+NS_PER_HOUR = 3_600_000_000_000
+NS_PER_DAY = 86_400_000_000_000
+
+# Hash space for top_n_words; bounds its memory independent of vocabulary
+N_HASH_FEATURES = 2 ** 18
+
+def _weekday_hour_hist(ts_ns):
+    """
+    24x7 message histogram straight from int64 ns timestamps, one pass.
+    Epoch day 0 (1970-01-01) was a Thursday, hence the +3 for Monday=0.
+    """
+    days, hours = np.divmod(ts_ns // NS_PER_HOUR, 24)
+    weekday = (days + 3) % 7
+    return np.bincount(hours * 7 + weekday, minlength=24 * 7).reshape(24, 7)
+
+def _binned_mean(ts_ns, values, window_days):
     """
-    Remove media-only, empty, or single punctuation messages (".", "?") from analysis.
+    Mean of values per fixed window of days, anchored at the first day seen.
+    Returns (window start dates, means); empty windows are NaN like resample.
+    """
+    day = ts_ns // NS_PER_DAY
+    start = day.min()
+    bins = (day - start) // window_days
+    sums = np.bincount(bins, weights=values)
+    counts = np.bincount(bins)
+    means = np.divide(sums, counts, out=np.full(sums.shape, np.nan), where=counts > 0)
+    dates = (start + np.arange(len(sums)) * window_days).astype('datetime64[D]')
+    return dates, means
+
+def filter_mask(df):
     """
-    mask = (~df['Message'].str.contains('<Media omitted>', na=False)) & \
+    Boolean mask excluding media-only, empty, or single punctuation messages
+    (".", "?") from analysis. Returning the mask lets callers select just the
+    columns they need instead of copying the whole frame.
+    """
+    return (~df['Message'].str.contains('<Media omitted>', na=False)) & \
            df['Message'].notna() & (df['Message'] != '') & \
            (~df['Message'].isin(['.', '?']))
-    return df[mask].copy()
 
 # 1. Overall stats including media and emoji counts
 
-def fetch_stats(selected_user, df):
+@st.cache_data(show_spinner=False)
+def fetch_stats(df):
     """
-    Return: total_messages, total_words, total_media, total_emojis
-    for Overall or specific user.
+    Return: total_messages, total_words, total_media, total_emojis,
+    urls_shared. Expects the frame already filtered to the selected user.
     """
-    if selected_user == 'Overall':
-        subset = df
-    else:
-        subset = df[df['Sender'] == selected_user]
-
-    total_messages = subset.shape[0]
+    total_messages = df.shape[0]
     # media count
-    total_media = subset['Message'].str.contains('<Media omitted>', na=False).sum()
+    total_media = df['Message'].str.contains('<Media omitted>', na=False).sum()
     # text-only messages
-    text_df = filter_media(subset)
-    # word count
-    total_words = text_df['Message'].str.split().apply(len).sum()
-    # emoji count
-    def extract_emojis(s): return [c for c in s if c in emoji.EMOJI_DATA]
-    emojis = text_df['Message'].astype(str).apply(extract_emojis)
-    total_emojis = emojis.apply(len).sum()
+    text_msgs = df.loc[filter_mask(df), 'Message']
+    # word count (regex runs in C; no per-row token list to allocate)
+    total_words = text_msgs.str.count(r'\S+').sum()
+    # emoji count (pattern string, not the compiled object: Arrow's
+    # count kernel takes the regex source)
+    total_emojis = text_msgs.str.count(EMOJI_RE.pattern).sum()
     # Links count
-    extractor = URLExtract()
-    y = []
-    for m in df['Message']:
-        y.extend(extractor.find_urls(m))
+    urls_shared = df['Message'].str.count(URL_RE.pattern).sum()
 
-    return total_messages, total_words, total_media, total_emojis, len(y)
+    return total_messages, total_words, total_media, total_emojis, urls_shared
 
 # 2. Messages per user (text only)
 
-def messages_per_user(df):
+@st.cache_data(show_spinner=False)
+def messages_per_user(text_df):
     """
-    Return a DataFrame with count of top 10 non-media messages per user, sorted descending.
+    Return a DataFrame with count of top 10 messages per user, sorted descending.
+    Expects a frame already filtered via filter_mask.
     """
-    text_df = filter_media(df)
-    result = (text_df.groupby('Sender').size().reset_index(name='count').sort_values('count', ascending=False).head(10))
-    return result
+    counts = text_df['Sender'].value_counts()
+    # Categorical Sender reports unobserved categories as 0; drop them so
+    # fully-filtered senders don't appear as empty bars
+    counts = counts[counts > 0]
+    return counts.head(10).rename_axis('Sender').reset_index(name='count')
 
+@st.cache_data(show_spinner=False)
 def avg_msg_per_user(df):
     total_messages = len(df)
     counts = df['Sender'].value_counts()
+    counts = counts[counts > 0]  # drop unobserved categories, see messages_per_user
     percentages = counts / total_messages * 100
 
     # build the DataFrame
@@ -78,91 +126,138 @@ def avg_msg_per_user(df):
 
 # 3. Activity heatmap data (text only)
 
-def activity_heatmap(df):
+@st.cache_data(show_spinner=False)
+def activity_heatmap(text_df):
     """
     Return pivot table: rows=hour, cols=weekday, values=count.
+    Expects a frame already filtered via filter_mask.
     """
-    text_df = filter_media(df)
-    text_df['weekday'] = text_df['date'].dt.day_name()
-    text_df['hour'] = text_df['date'].dt.hour
-    heat = text_df.groupby(['weekday','hour']).size().reset_index(name='count')
+    # One arithmetic pass over the raw int64 timestamps; no .dt accessor
+    # Series allocated at all (see _weekday_hour_hist)
+    ts_ns = text_df['date'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    grid = _weekday_hour_hist(ts_ns)
     days = ['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday']
-    heat['weekday'] = pd.Categorical(heat['weekday'], categories=days, ordered=True)
-    pivot = heat.pivot(index='hour', columns='weekday', values='count').fillna(0)
-    return pivot
+    return pd.DataFrame(grid, index=pd.RangeIndex(24, name='hour'),
+                        columns=pd.Index(days, name='weekday'))
 
 # 4. Time series: daily & monthly (text only)
 
-def daily_volume(df):
+@st.cache_data(show_spinner=False)
+def daily_volume(text_df):
     """
     Return daily message counts for text-only messages.
     """
-    text_df = filter_media(df).set_index('date')
-    return text_df.resample('D').size().reset_index(name='count')
+    # Truncating the datetime64 array to day precision and counting with
+    # np.unique skips resample's set_index copy and offset logic
+    days = text_df['date'].to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+    unique, counts = np.unique(days, return_counts=True)
+    return pd.DataFrame({'date': unique, 'count': counts})
 
 
-def monthly_volume(df):
+@st.cache_data(show_spinner=False)
+def monthly_volume(text_df):
     """
     Return monthly message counts for text-only messages.
     """
-    text_df = filter_media(df).set_index('date')
-    return text_df.resample('M').size().reset_index(name='count')
+    months = text_df['date'].to_numpy(dtype='datetime64[ns]').astype('datetime64[M]')
+    unique, counts = np.unique(months, return_counts=True)
+    return pd.DataFrame({'date': unique, 'count': counts})
 
 # 5. Word frequency & wordcloud (text only)
 
-def top_n_words(df, n=20):
+@st.cache_data(show_spinner=False)
+def top_n_words(text_df, n=20):
     """
     Return DataFrame of top n words (text-only), excluding stopwords.
     """
-    text_df = filter_media(df)
-    vec = CountVectorizer(max_features=n, stop_words='english')
-    bag = vec.fit_transform(text_df['Message'].astype(str))
-    words = vec.get_feature_names_out()
-    counts = bag.sum(axis=0).A1
-    return pd.DataFrame({'word': words, 'count': counts})
+    if text_df.empty:
+        return pd.DataFrame({'word': [], 'count': []})
+    # HashingVectorizer is stateless — no vocabulary dict to build — so
+    # memory stays bounded by the fixed hash space however large the chat.
+    # alternate_sign=False/norm=None keep the entries plain counts.
+    vec = HashingVectorizer(n_features=N_HASH_FEATURES, stop_words='english',
+                            alternate_sign=False, norm=None, dtype=np.int32)
+    bag = vec.transform(text_df['Message'].values)
+    counts = np.asarray(bag.sum(axis=0)).ravel()
+    top_idx = set(np.argpartition(counts, -n)[-n:].tolist())
+
+    # Resolve the winning hash buckets back to words: collect the tokens
+    # that land in them (abs(murmurhash) % n_features mirrors sklearn's
+    # bucketing), then count that tiny fixed vocabulary exactly so hash
+    # collisions can't misrank anything
+    analyzer = vec.build_analyzer()
+    candidates = set()
+    for doc in text_df['Message']:
+        for tok in analyzer(doc):
+            if abs(murmurhash3_32(tok)) % N_HASH_FEATURES in top_idx:
+                candidates.add(tok)
+    if not candidates:
+        return pd.DataFrame({'word': [], 'count': []})
+    cand_vec = CountVectorizer(vocabulary=sorted(candidates), dtype=np.int32)
+    cand_counts = np.asarray(cand_vec.transform(text_df['Message'].values).sum(axis=0)).ravel()
+    order = np.argsort(cand_counts)[::-1][:n]
+    return pd.DataFrame({'word': cand_vec.get_feature_names_out()[order],
+                         'count': cand_counts[order]})
 
 
-def generate_wordcloud(df):
+@st.cache_data(show_spinner=False)
+def generate_wordcloud(text_df):
     """
-    Return a WordCloud for all text-only messages.
+    Return the rendered wordcloud image array for all text-only messages.
+    (An array, not the WordCloud object, so st.cache_data can pickle it.)
     """
-    text = ' '.join(filter_media(df)['Message'].astype(str).tolist())
-    wc = WordCloud(width=800, height=400, background_color='white').generate(text)
-    return wc
+    # Feed precomputed frequencies instead of one giant joined string:
+    # peak memory is O(vocab) rather than O(total chars), and WordCloud
+    # skips its own tokenization pass
+    tokens = text_df['Message'].str.lower().str.findall(r"[a-z']{2,}")
+    freqs = Counter()
+    for sub in tokens:
+        freqs.update(t for t in sub if t not in STOPWORDS)
+    if not freqs:
+        # Nothing to plot (e.g. a non-chat upload): blank white canvas
+        # instead of WordCloud's "need at least 1 word" ValueError
+        return np.full((400, 800, 3), 255, dtype=np.uint8)
+    wc = WordCloud(width=800, height=400, background_color='white').generate_from_frequencies(freqs)
+    return wc.to_array()
 
 # 6. Message type counts for pie chart
 
+@st.cache_data(show_spinner=False)
 def message_type_counts(df):
     """
-    Return tuple: text_count, media_count, link_count.
+    Return tuple: text_count, media_count, link_count, from the kind column
+    computed once in preprocess (0=text, 1=media, 2=link).
     """
-    media = df['Message'].str.contains('<Media omitted>', na=False).sum()
-    links = df['Message'].str.contains('http', na=False).sum()
-    text_msgs = df.shape[0] - media
-    return text_msgs, media, links
+    counts = np.bincount(df['kind'].to_numpy(), minlength=3)
+    return counts[0], counts[1], counts[2]
 
 # 7. Sentiment over time (text only)
 
-def sentiment_time_series(df, window='7D'):
+@st.cache_data(show_spinner=False)
+def sentiment_time_series(text_df, window='7D'):
     """
     Return rolling mean sentiment polarity over time for text-only msgs.
     """
-    text_df = filter_media(df).copy()
-    text_df['sentiment'] = text_df['Message'].apply(lambda m: TextBlob(m).sentiment.polarity)
-    ts = text_df.set_index('date').resample(window)['sentiment'].mean().reset_index()
-    return ts
+    if text_df.empty:
+        return pd.DataFrame(columns=['date', 'sentiment'])
+    # Chats repeat short messages ("ok", "lol", ...) heavily; score each
+    # unique string once and broadcast the result back over the rows
+    uniq = text_df['Message'].drop_duplicates().reset_index(drop=True)
+    tokens = uniq.str.lower().str.findall(WORD_RE).explode()
+    pol = tokens.map(POLARITY).groupby(level=0).mean().reindex(uniq.index).fillna(0.0)
+    sent = text_df['Message'].map(pd.Series(pol.to_numpy(), index=uniq)).to_numpy(dtype=np.float64)
+    ts_ns = text_df['date'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    dates, means = _binned_mean(ts_ns, sent, pd.Timedelta(window).days)
+    return pd.DataFrame({'date': dates, 'sentiment': means})
 
 # 8. Emoji usage stats (text only)
 
-def top_emojis(df, n=10):
+@st.cache_data(show_spinner=False)
+def top_emojis(text_df, n=10):
     """
     Return DataFrame of top n emojis by frequency in text-only messages.
     """
-    text_df = filter_media(df)
-    def extract_emojis(s): return [c for c in s if c in emoji.EMOJI_DATA]
-    ems = text_df['Message'].astype(str).apply(extract_emojis)
-    all_ems = [e for sub in ems for e in sub]
-    counts = pd.Series(all_ems).value_counts().head(n)
-    return counts.reset_index().rename(columns={'index':'emoji', 0:'count'})
+    counts = text_df['Message'].str.findall(EMOJI_RE).explode().dropna().value_counts().head(n)
+    return counts.rename_axis('emoji').reset_index(name='count')
 
 
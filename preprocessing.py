@@ -1,55 +1,79 @@
 import re
+import numpy as np
 import pandas as pd
+import streamlit as st
 
+# Message header, compiled once at import. Matching only the one-line
+# 'date, time - sender: ' header and slicing each body out between
+# consecutive date lines keeps the scan linear, where a non-greedy DOTALL
+# body match would re-try the lookahead at every newline. The sender part
+# is optional so senderless system lines ("X joined", the encryption
+# notice) still terminate the previous body; they are then dropped.
+HDR = re.compile(
+    r'^(\d{1,2}/\d{1,2}/\d{2,4}, \d{1,2}:\d{2} [ap]m) - (?:([^:\n]+?): )?',
+    flags=re.MULTILINE | re.IGNORECASE)
+
+def _empty_frame():
+    """
+    Frame with the same columns *and dtypes* preprocess produces, so a
+    non-chat upload flows through the numeric helpers without TypeErrors.
+    """
+    return pd.DataFrame({
+        'date': pd.Series([], dtype='datetime64[ns]'),
+        'Sender': pd.Series([], dtype='category'),
+        'Message': pd.Series([], dtype='string[pyarrow]'),
+        'kind': pd.Series([], dtype='int8'),
+        'year': pd.Series([], dtype='int64'),
+        'month': pd.Series([], dtype='int64'),
+        'day': pd.Series([], dtype='int64'),
+        'hour': pd.Series([], dtype='int64'),
+        'minute': pd.Series([], dtype='int64'),
+    })
+
+@st.cache_data(show_spinner=False)
 def preprocess(data):
     data = data.replace('\u202f', ' ')
 
-    pattern = re.compile(
-    r'(\d{1,2}/\d{1,2}/\d{2,4},\s\d{1,2}:\d{2}\s(?:am|pm))'  # group 1 = date + time
-    r'\s-\s'
-    r'([^:]+?):'                                           # group 2 = sender
-    r'\s'                                                  # space after the colon
-    r'(.+?)(?=(?:\n\d{1,2}/\d{1,2}/\d{2,4},)|\Z)',          # group 3 = message until next date or end
-    flags=re.IGNORECASE | re.DOTALL)
-
-    matches = pattern.findall(data)
-
-    dates    = [m[0] for m in matches]
-    senders  = [m[1] for m in matches]
-    msg = [m[2].strip() for m in matches]  # strip trailing newlines/spaces
-
-    # Now if you really want “sender: message” in one string:
-    messages = [f"{s}: {t}" for s, t in zip(senders, msg)]
-
-    df = pd.DataFrame({'user_message':messages,'message_date':dates}) # Putting in a dataframe
-    df['message_date'] = pd.to_datetime(df['message_date'], format= '%d/%m/%y, %I:%M %p') # Converting the data type
-    df.rename(columns={'message_date':'date'}, inplace = True)
-
-    senders = []
-    texts   = []
-
-    for msg in df['user_message']:
-        if ": " in msg:
-            # split into [sender, rest_of_message]
-            sender, text = msg.split(": ", 1)
-        else:
-            # no “: ” means it’s a system/group notification
-            sender, text = "group_notification", msg
-
-        senders.append(sender)
-        texts.append(text)
-
-    # assign back to the DataFrame
-    df['Sender']  = senders
-    df['Message'] = texts
-
-    # drop the old combined column if you like
-    df.drop(columns=['user_message'], inplace=True)
-
-    df['year'] = df['date'].dt.year
-    df['month'] = df['date'].dt.month_name()
-    df['day'] = df['date'].dt.day
-    df['hour'] = df['date'].dt.hour
-    df['minute'] = df['date'].dt.minute
+    matches = list(HDR.finditer(data))
+    # Each body runs from the end of its header to the next date line;
+    # system/notification lines (no 'sender: ') act only as boundaries
+    ends = [m.start() for m in matches[1:]] + [len(data)]
+    rows = [(m[1], m[2], data[m.end():end].strip())
+            for m, end in zip(matches, ends) if m[2] is not None]
+    if not rows:
+        return _empty_frame()
+
+    dates, senders, msg = zip(*rows)
+
+    # The regex already captured sender and message separately, so build
+    # the frame straight from the groups
+    df = pd.DataFrame({
+        'date': pd.to_datetime(dates, format='%d/%m/%y, %I:%M %p', cache=True),
+        'Sender': senders,
+        # Arrow-backed strings: one contiguous buffer instead of per-row
+        # Python objects, and .str kernels dispatch into Arrow's C++ code
+        'Message': pd.array(msg, dtype='string[pyarrow]'),
+    })
+
+    # Senders are low-cardinality; category dtype makes the per-user filter
+    # and groupby/value_counts work on integer codes instead of strings
+    df['Sender'] = df['Sender'].astype('category')
+
+    # Classify each message once: 0 = text, 1 = media, 2 = link. Downstream
+    # type counts become a bincount instead of repeated str.contains scans.
+    df['kind'] = np.where(df['Message'].str.contains('<Media omitted>', na=False), 1,
+                          np.where(df['Message'].str.contains('http', na=False), 2, 0)).astype('int8')
+
+    # Derive all date parts from the raw datetime64 buffer in numpy rather
+    # than five .dt accessor passes (month_name() in particular loops in
+    # Python). Month is stored as a number; format it only when displayed.
+    ts = df['date'].to_numpy()
+    months = ts.astype('datetime64[M]').astype(np.int64)   # months since 1970-01
+    secs = ts.astype('datetime64[s]').astype(np.int64)
+    df['year'] = months // 12 + 1970
+    df['month'] = months % 12 + 1
+    df['day'] = (ts.astype('datetime64[D]') - ts.astype('datetime64[M]')).astype(np.int64) + 1
+    df['hour'] = secs // 3600 % 24
+    df['minute'] = secs // 60 % 60
 
     return df